@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Offline GPX preprocessing for PrintMyRide poster thumbnails
+
+Moves route simplification out of render time:
+  - GPX files are stream-parsed with iterparse; elements are dropped as soon
+    as they are read, so parsing memory stays flat on 100k+ point rides
+  - routes are projected like RenderMath.project (equirectangular around the
+    mean latitude) and simplified with NumPy-vectorized Douglas-Peucker or
+    Visvalingam-Whyatt, once per thumbnail size
+  - the levels are written to a compact binary polyline cache (.pmrpoly)
+    that the renderer can memory-map
+  - batches of rides are processed in a process pool
+
+Usage:
+  python3 artifacts/gpx_preprocess.py Fixtures/*.gpx -o build/polylines
+  python3 artifacts/gpx_preprocess.py --benchmark --bench-points 100000,250000
+
+Cache layout (little-endian):
+  header   magic "PMRPOLY\\0", version u16, level count u16, source points u32,
+           min lon, min lat, max lon, max lat, kx (f64 each)
+  levels   per level: size in pixels u32, point count u32, data offset u64
+  data     per level: float32 x, y pairs, 8-byte aligned.  Coordinates are
+           projected and divided by the longer side of the route's bounds,
+           so they lie in [0, 1] with y pointing north.
+"""
+
+import argparse
+import json
+import math
+import mmap
+import os
+import random
+import resource
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+CACHE_MAGIC = b"PMRPOLY\0"
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".pmrpoly"
+HEADER = struct.Struct("<8sHHI5d")
+LEVEL = struct.Struct("<IIQ")
+
+# Thumbnail sizes (longer side, in pixels) and the allowed error in pixels
+DEFAULT_LEVELS = (256, 512, 1024, 2048)
+DEFAULT_TOLERANCE_PX = 0.5
+
+def local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+def parse_track_points(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Stream the trkpt coordinates of a GPX file into (lat, lon) arrays
+    
+    All track segments are joined, like GPXParser does in the app.  Every
+    element is detached from its parent once it has been read.
+    """
+    lats = array("d")
+    lons = array("d")
+    parents = []
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            parents.append(elem)
+            continue
+        parents.pop()
+        if local_name(elem.tag) == "trkpt":
+            try:
+                lat, lon = float(elem.get("lat")), float(elem.get("lon"))
+            except (TypeError, ValueError):
+                pass  # Skipped, as the app does for unparsable points
+            else:
+                lats.append(lat)
+                lons.append(lon)
+        elem.clear()
+        if parents:
+            parents[-1].remove(elem)
+    return np.frombuffer(lats, dtype=np.float64), np.frombuffer(lons, dtype=np.float64)
+
+def project(lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, Dict]:
+    """Project like RenderMath.project and scale the longer side to 1
+    
+    Returns the (n, 2) points and the bounds needed to undo the projection.
+    """
+    kx = math.cos(math.radians(lats.mean()))
+    min_lat, max_lat = lats.min(), lats.max()
+    min_lon, max_lon = lons.min(), lons.max()
+    points = np.empty((lats.size, 2))
+    points[:, 0] = (lons - min_lon) * kx
+    points[:, 1] = lats - min_lat
+    extent = max((max_lon - min_lon) * kx, max_lat - min_lat)
+    if extent > 0:
+        points /= extent
+    bounds = {"min_lon": min_lon, "min_lat": min_lat, "max_lon": max_lon, "max_lat": max_lat, "kx": kx}
+    return points, bounds
+
+def line_distances(px, py, ax, ay, bx, by) -> np.ndarray:
+    """Distance of each point p to the line through a and b, computed like
+    Simplify.perpDistance so that ties break the same way"""
+    dx = bx - ax
+    dy = by - ay
+    length_squared = dx * dx + dy * dy
+    # t = 0 when a == b, so p is measured against a, as perpDistance does
+    t = np.divide((px - ax) * dx + (py - ay) * dy, length_squared,
+                  out=np.zeros_like(length_squared), where=length_squared > 0)
+    return np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+def douglas_peucker(points: np.ndarray, epsilon: float) -> np.ndarray:
+    """Indices of the points Douglas-Peucker keeps, same as Simplify.rdp
+    
+    Instead of recursing, every open segment is split in the same NumPy pass,
+    so the number of passes is the depth of the recursion.
+    """
+    n = len(points)
+    if n < 3 or epsilon <= 0:
+        return np.arange(n)
+    xs = np.ascontiguousarray(points[:, 0])
+    ys = np.ascontiguousarray(points[:, 1])
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    starts = np.array([0])
+    ends = np.array([n - 1])
+    while starts.size:
+        counts = ends - starts - 1
+        open_segments = counts > 0
+        starts, ends, counts = starts[open_segments], ends[open_segments], counts[open_segments]
+        if not starts.size:
+            break
+        
+        segment = np.repeat(np.arange(starts.size), counts)
+        first = np.cumsum(counts) - counts
+        index = np.arange(segment.size) - first[segment] + starts[segment] + 1
+        a = starts[segment]
+        b = ends[segment]
+        distances = line_distances(xs[index], ys[index], xs[a], ys[a], xs[b], ys[b])
+        
+        farthest = np.maximum.reduceat(distances, first)
+        # The first farthest point of each segment, like the strict > in Simplify.rdp
+        candidates = np.flatnonzero(distances == farthest[segment])
+        _, first_candidate = np.unique(segment[candidates], return_index=True)
+        split_at = index[candidates[first_candidate]]
+        
+        split = farthest > epsilon
+        split_at = split_at[split]
+        keep[split_at] = True
+        starts = np.concatenate([starts[split], split_at])
+        ends = np.concatenate([split_at, ends[split]])
+    return np.flatnonzero(keep)
+
+def visvalingam(points: np.ndarray, min_area: float) -> np.ndarray:
+    """Indices of the points Visvalingam-Whyatt keeps for |min_area|
+    
+    Rather than removing one point at a time from a heap, each pass removes
+    every point whose triangle is below |min_area| and smaller than both
+    neighbours' triangles; no two of those are adjacent, so they can all go
+    at once.
+    """
+    index = np.arange(len(points))
+    if min_area <= 0:
+        return index
+    while index.size > 2:
+        p = points[index]
+        u = p[1:-1] - p[:-2]
+        v = p[2:] - p[:-2]
+        areas = 0.5 * np.abs(u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0])
+        small = areas < min_area
+        if not small.any():
+            break
+        padded = np.concatenate(([np.inf], areas, [np.inf]))
+        remove = small & (areas <= padded[:-2]) & (areas < padded[2:])
+        index = np.concatenate((index[:1], index[1:-1][~remove], index[-1:]))
+    return index
+
+SIMPLIFIERS = {
+    "dp": lambda points, tolerance: douglas_peucker(points, tolerance),
+    "vw": lambda points, tolerance: visvalingam(points, tolerance * tolerance),
+}
+
+def simplify_levels(points: np.ndarray, levels, tolerance_px: float = DEFAULT_TOLERANCE_PX,
+                    algorithm: str = "dp") -> Dict[int, np.ndarray]:
+    """Simplify |points| once per level; returns size → (m, 2) float32 points
+    
+    Each level is simplified from the next larger level's result rather than
+    from all points, which is several times faster.  The error of a level is
+    then at most the sum of its tolerance and the larger levels' tolerances,
+    under twice its own when the sizes double.
+    """
+    simplifier = SIMPLIFIERS[algorithm]
+    simplified = {}
+    current = points
+    for size in sorted(levels, reverse=True):
+        current = current[simplifier(current, tolerance_px / size)]
+        simplified[size] = current.astype(np.float32)
+    return dict(sorted(simplified.items()))
+
+def current_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+def write_cache(path: str, bounds: Dict, source_points: int, levels: Dict[int, np.ndarray]):
+    """Write the simplified levels to a .pmrpoly cache file"""
+    offset = HEADER.size + LEVEL.size * len(levels)
+    table = []
+    for size, points in levels.items():
+        offset = (offset + 7) & ~7
+        table.append((size, len(points), offset))
+        offset += points.nbytes
+    
+    # A unique temporary name, so that concurrent writers never share one
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                     prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            # mkstemp creates the file private; use the permissions open() would
+            os.fchmod(f.fileno(), 0o666 & ~current_umask())
+            f.write(HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(levels), source_points,
+                                bounds["min_lon"], bounds["min_lat"], bounds["max_lon"], bounds["max_lat"],
+                                bounds["kx"]))
+            for entry in table:
+                f.write(LEVEL.pack(*entry))
+            for (size, count, data_offset), points in zip(table, levels.values()):
+                f.write(b"\0" * (data_offset - f.tell()))
+                f.write(np.ascontiguousarray(points, dtype="<f4").tobytes())
+        os.replace(temp_path, path)
+    except BaseException:
+        # Don't leave a partial cache behind, e.g. when the disk is full
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+class PolylineCache:
+    """A memory-mapped .pmrpoly file; levels are NumPy views, not copies"""
+    
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise ValueError(f"{path} is not a polyline cache")
+        magic, version, level_count, self.source_points, *bounds = HEADER.unpack_from(self._map)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            raise ValueError(f"{path} is not a version {CACHE_VERSION} polyline cache")
+        self.bounds = dict(zip(("min_lon", "min_lat", "max_lon", "max_lat", "kx"), bounds))
+        self.levels = {}
+        for i in range(level_count):
+            size, count, offset = LEVEL.unpack_from(self._map, HEADER.size + i * LEVEL.size)
+            self.levels[size] = np.frombuffer(self._map, dtype="<f4", count=count * 2, offset=offset).reshape(-1, 2)
+    
+    def level_for(self, pixels: int) -> np.ndarray:
+        """The coarsest level that is still detailed enough for |pixels|"""
+        sizes = [size for size in self.levels if size >= pixels]
+        return self.levels[min(sizes) if sizes else max(self.levels)]
+
+def preprocess_file(path: str, output_dir: str, levels=DEFAULT_LEVELS,
+                    tolerance_px: float = DEFAULT_TOLERANCE_PX, algorithm: str = "dp") -> Dict:
+    """Parse, simplify and cache one ride; returns its stats"""
+    stats = {"file": path}
+    try:
+        start = time.perf_counter()
+        lats, lons = parse_track_points(path)
+        stats["parse_seconds"] = time.perf_counter() - start
+        stats["points"] = int(lats.size)
+        if lats.size < 2:
+            raise ValueError("fewer than 2 track points")
+        
+        start = time.perf_counter()
+        points, bounds = project(lats, lons)
+        simplified = simplify_levels(points, levels, tolerance_px, algorithm)
+        stats["simplify_seconds"] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        output = output_path(path, output_dir)
+        write_cache(output, bounds, int(lats.size), simplified)
+        stats["write_seconds"] = time.perf_counter() - start
+        stats["output"] = output
+        stats["levels"] = {size: len(level) for size, level in simplified.items()}
+    except (OSError, ET.ParseError, ValueError) as e:
+        stats["error"] = str(e)
+    return stats
+
+def output_path(path: str, output_dir: str) -> str:
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + CACHE_SUFFIX)
+
+def _preprocess_task(task) -> Dict:
+    return preprocess_file(*task)
+
+def preprocess_batch(paths: List[str], output_dir: str, levels=DEFAULT_LEVELS,
+                     tolerance_px: float = DEFAULT_TOLERANCE_PX, algorithm: str = "dp",
+                     jobs: int = None) -> List[Dict]:
+    """Preprocess many rides, in a process pool when there is more than one
+    
+    Each ride is written to its basename in |output_dir|, so two paths with the
+    same basename are rejected rather than overwriting each other.
+    """
+    outputs = {}
+    for path in paths:
+        output = output_path(path, output_dir)
+        if output in outputs:
+            raise ValueError(f"{path} and {outputs[output]} would both be written to {output}")
+        outputs[output] = path
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [(path, output_dir, tuple(levels), tolerance_px, algorithm) for path in paths]
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+    if jobs <= 1:
+        return [_preprocess_task(task) for task in tasks]
+    with ProcessPoolExecutor(jobs) as pool:
+        return list(pool.map(_preprocess_task, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+
+def write_synthetic_gpx(path: str, point_count: int, seed: int = 0):
+    """Write a long ride as a random walk around Boulder, streamed to disk"""
+    rng = random.Random(seed)
+    lat, lon, heading, ele = 40.0150, -105.2705, 0.0, 1655.0
+    start = 1751976000  # 2025-07-08T12:00:00Z, like Demo_Boulder.gpx
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<gpx version="1.1" creator="PrintMyRide Benchmark" xmlns="http://www.topografix.com/GPX/1/1">\n'
+                f"  <trk>\n    <name>Synthetic {point_count} points</name>\n    <trkseg>\n")
+        chunk = []
+        for i in range(point_count):
+            heading += rng.gauss(0, 0.15)
+            lat += 0.00004 * math.cos(heading)
+            lon += 0.00005 * math.sin(heading)
+            ele += rng.gauss(0, 0.5)
+            stamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(start + i))
+            chunk.append(f'      <trkpt lat="{lat:.6f}" lon="{lon:.6f}">\n'
+                         f"        <ele>{ele:.1f}</ele>\n        <time>{stamp}</time>\n      </trkpt>\n")
+            if len(chunk) == 10000:
+                f.write("".join(chunk))
+                chunk = []
+        f.write("".join(chunk))
+        f.write("    </trkseg>\n  </trk>\n</gpx>\n")
+
+def peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def traced_peak_mb(func, *args) -> float:
+    """Peak Python/NumPy allocations while running func(*args)"""
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+def run_benchmark(point_counts: List[int], levels, tolerance_px: float, jobs: int = None) -> Dict:
+    """Time parsing, simplification and batch processing on synthetic rides"""
+    results = {"levels": list(levels), "tolerance_px": tolerance_px, "rides": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for count in point_counts:
+            path = os.path.join(tmp, f"synthetic_{count}.gpx")
+            write_synthetic_gpx(path, count, seed=count)
+            paths.append(path)
+        
+        print("🚴 Single ride")
+        for count, path in zip(point_counts, paths):
+            start = time.perf_counter()
+            lats, lons = parse_track_points(path)
+            parse_seconds = time.perf_counter() - start
+            points, bounds = project(lats, lons)
+            
+            ride = {
+                "points": count,
+                "file_mb": round(os.path.getsize(path) / (1024 * 1024), 2),
+                "parse_points_per_second": round(count / parse_seconds),
+                "parse_peak_mb": round(traced_peak_mb(parse_track_points, path), 2),
+            }
+            for algorithm in SIMPLIFIERS:
+                start = time.perf_counter()
+                simplified = simplify_levels(points, levels, tolerance_px, algorithm)
+                seconds = time.perf_counter() - start
+                ride[algorithm] = {
+                    "points_per_second": round(count / seconds),
+                    "kept": {size: len(level) for size, level in simplified.items()},
+                }
+            ride["pipeline_peak_mb"] = round(
+                traced_peak_mb(preprocess_file, path, tmp, levels, tolerance_px, "dp"), 2)
+            results["rides"].append(ride)
+            
+            print(f"   {count:>8} points ({ride['file_mb']}MB): parse {ride['parse_points_per_second']:,} pts/s, "
+                  f"peak {ride['parse_peak_mb']}MB; pipeline peak {ride['pipeline_peak_mb']}MB")
+            for algorithm in SIMPLIFIERS:
+                kept = ", ".join(f"{size}px:{n}" for size, n in ride[algorithm]["kept"].items())
+                print(f"      {algorithm}: {ride[algorithm]['points_per_second']:,} pts/s ({kept})")
+        
+        print("📦 Batch")
+        batch = []
+        for copy in range(4):
+            for count, path in zip(point_counts, paths):
+                batch_path = os.path.join(tmp, f"batch_{copy}_{count}.gpx")
+                os.link(path, batch_path)
+                batch.append(batch_path)
+        start = time.perf_counter()
+        stats = preprocess_batch(batch, os.path.join(tmp, "out"), levels, tolerance_px, "dp", jobs)
+        seconds = time.perf_counter() - start
+        total_points = sum(s.get("points", 0) for s in stats)
+        results["batch"] = {
+            "rides": len(batch),
+            "jobs": min(jobs or os.cpu_count() or 1, len(batch)),
+            "points_per_second": round(total_points / seconds),
+            "rides_per_second": round(len(batch) / seconds, 2),
+        }
+        print(f"   {len(batch)} rides, {results['batch']['jobs']} workers: "
+              f"{results['batch']['points_per_second']:,} pts/s, {results['batch']['rides_per_second']} rides/s")
+    
+    results["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    results["worker_peak_rss_mb"] = round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1)
+    print(f"💾 Peak RSS: {results['peak_rss_mb']}MB, workers {results['worker_peak_rss_mb']}MB")
+    return results
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Preprocess GPX routes into polyline caches for poster thumbnails")
+    parser.add_argument("gpx", nargs="*", help="GPX files to preprocess")
+    parser.add_argument("-o", "--output-dir", default="build/polylines", help="where to write the .pmrpoly files")
+    parser.add_argument("--levels", type=parse_int_list, default=list(DEFAULT_LEVELS),
+                        help="thumbnail sizes in pixels (default: %(default)s)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE_PX,
+                        help="allowed error in pixels (default: %(default)s)")
+    parser.add_argument("--algorithm", choices=sorted(SIMPLIFIERS), default="dp",
+                        help="Douglas-Peucker or Visvalingam-Whyatt (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--benchmark", action="store_true", help="benchmark on synthetic long rides")
+    parser.add_argument("--bench-points", type=parse_int_list, default=[100000, 250000],
+                        help="points per synthetic ride (default: %(default)s)")
+    parser.add_argument("--report", help="save the stats or benchmark results as JSON")
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        results = run_benchmark(args.bench_points, args.levels, args.tolerance, args.jobs)
+    elif args.gpx:
+        start = time.perf_counter()
+        try:
+            results = preprocess_batch(args.gpx, args.output_dir, args.levels, args.tolerance, args.algorithm,
+                                       args.jobs)
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+        seconds = time.perf_counter() - start
+        for stats in results:
+            if "error" in stats:
+                print(f"❌ {stats['file']}: {stats['error']}")
+            else:
+                kept = ", ".join(f"{size}px:{n}" for size, n in stats["levels"].items())
+                print(f"✅ {stats['file']}: {stats['points']} points → {kept}")
+        print(f"⏱️  {len(results)} rides in {seconds * 1000:.1f}ms")
+    else:
+        parser.error("give GPX files to preprocess, or --benchmark")
+    
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"📄 Report saved to {args.report}")
+    if not args.benchmark and any("error" in stats for stats in results):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Unit tests for gpx_preprocess.py"""
+
+import math
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import numpy as np
+
+import gpx_preprocess as gpx
+
+def reference_rdp(points, epsilon):
+    """Recursive Douglas-Peucker, as Simplify.rdp does it in the app"""
+    def distance(p, a, b):
+        dx, dy = b[0] - a[0], b[1] - a[1]
+        length_squared = dx * dx + dy * dy
+        t = ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / length_squared if length_squared > 0 else 0.0
+        return math.hypot(p[0] - (a[0] + t * dx), p[1] - (a[1] + t * dy))
+    
+    keep = {0, len(points) - 1}
+    
+    def rdp(start, end):
+        farthest, farthest_distance = None, 0.0
+        for i in range(start + 1, end):
+            d = distance(points[i], points[start], points[end])
+            if d > farthest_distance:
+                farthest, farthest_distance = i, d
+        if farthest is not None and farthest_distance > epsilon:
+            keep.add(farthest)
+            rdp(start, farthest)
+            rdp(farthest, end)
+    
+    rdp(0, len(points) - 1)
+    return sorted(keep)
+
+def triangle_area(a, b, c):
+    return 0.5 * abs((b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0]))
+
+def reference_visvalingam(points, min_area):
+    """One point at a time version of the passes of gpx.visvalingam"""
+    index = list(range(len(points)))
+    while len(index) > 2:
+        areas = [triangle_area(*(points[j] for j in index[i - 1:i + 2])) for i in range(1, len(index) - 1)]
+        padded = [math.inf] + areas + [math.inf]
+        remove = {i + 1 for i, area in enumerate(areas)
+                  if area < min_area and area <= padded[i] and area < padded[i + 2]}
+        if not remove:
+            break
+        index = [j for i, j in enumerate(index) if i not in remove]
+    return index
+
+def random_walk(count, seed):
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(size=(count, 2)), axis=0)
+
+class SimplifyTest(unittest.TestCase):
+    def test_douglas_peucker(self):
+        for seed in range(5):
+            points = random_walk(500, seed)
+            for epsilon in (0.5, 2.0, 10.0):
+                self.assertEqual(reference_rdp(points.tolist(), epsilon),
+                                 gpx.douglas_peucker(points, epsilon).tolist())
+    
+    def test_douglas_peucker_collinear(self):
+        points = np.array([[0.0, 0.0], [1.0, 0.0], [2.0, 0.0], [2.0, 0.0], [3.0, 0.0]])
+        self.assertEqual([0, 4], gpx.douglas_peucker(points, 0.1).tolist())
+    
+    def test_visvalingam(self):
+        for seed in range(5):
+            points = random_walk(500, seed)
+            for min_area in (0.5, 4.0):
+                kept = gpx.visvalingam(points, min_area).tolist()
+                self.assertEqual(reference_visvalingam(points.tolist(), min_area), kept)
+                self.assertEqual([0, 499], [kept[0], kept[-1]])
+                for a, b, c in zip(kept, kept[1:], kept[2:]):
+                    self.assertGreaterEqual(triangle_area(points[a], points[b], points[c]), min_area)
+    
+    def test_simplify_levels(self):
+        points = random_walk(2000, 7)
+        points = (points - points.min(axis=0)) / np.ptp(points, axis=0).max()
+        levels = gpx.simplify_levels(points, (256, 1024), algorithm="dp")
+        self.assertEqual([256, 1024], list(levels))
+        self.assertEqual(np.float32, levels[256].dtype)
+        self.assertLess(len(levels[256]), len(levels[1024]))
+        self.assertLess(len(levels[1024]), len(points))
+
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "ride" + gpx.CACHE_SUFFIX)
+        self.bounds = {"min_lon": -105.3, "min_lat": 40.0, "max_lon": -105.2, "max_lat": 40.1, "kx": 0.766}
+        self.levels = {
+            256: np.array([[0, 0], [1, 1]], dtype=np.float32),
+            512: np.array([[0, 0], [0.5, 0.25], [1, 1]], dtype=np.float32),
+        }
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+    
+    def test_round_trip(self):
+        gpx.write_cache(self.path, self.bounds, 1234, self.levels)
+        cache = gpx.PolylineCache(self.path)
+        self.assertEqual(1234, cache.source_points)
+        self.assertEqual(self.bounds, cache.bounds)
+        self.assertEqual([256, 512], list(cache.levels))
+        for size, points in self.levels.items():
+            np.testing.assert_array_equal(points, cache.levels[size])
+        self.assertIs(cache.levels[256], cache.level_for(100))
+        self.assertIs(cache.levels[512], cache.level_for(300))
+        self.assertIs(cache.levels[512], cache.level_for(4096))
+        self.assertEqual([os.path.basename(self.path)], os.listdir(self.tmp))
+    
+    def test_rewrite(self):
+        gpx.write_cache(self.path, self.bounds, 1234, self.levels)
+        gpx.write_cache(self.path, self.bounds, 99, {128: self.levels[256]})
+        cache = gpx.PolylineCache(self.path)
+        self.assertEqual(99, cache.source_points)
+        self.assertEqual([128], list(cache.levels))
+    
+    def test_invalid(self):
+        gpx.write_cache(self.path, self.bounds, 1234, self.levels)
+        with open(self.path, "r+b") as f:
+            f.seek(len(gpx.CACHE_MAGIC))
+            f.write((gpx.CACHE_VERSION + 1).to_bytes(2, "little"))
+        self.assertRaises(ValueError, gpx.PolylineCache, self.path)
+        with open(self.path, "wb") as f:
+            f.write(b"not a cache")
+        self.assertRaises(ValueError, gpx.PolylineCache, self.path)
+    
+    def test_failed_write_leaves_no_temp_file(self):
+        gpx.write_cache(self.path, self.bounds, 1234, self.levels)
+        with mock.patch.object(gpx.os, "replace", side_effect=OSError("disk full")):
+            self.assertRaises(OSError, gpx.write_cache, self.path, self.bounds, 99, self.levels)
+        self.assertEqual([os.path.basename(self.path)], os.listdir(self.tmp))
+        self.assertEqual(1234, gpx.PolylineCache(self.path).source_points)
+    
+    def test_concurrent_writes(self):
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda i: gpx.write_cache(self.path, self.bounds, i, self.levels), range(32)))
+        self.assertEqual([os.path.basename(self.path)], os.listdir(self.tmp))
+        self.assertIn(gpx.PolylineCache(self.path).source_points, range(32))
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.tmp, "out")
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+    
+    def write_ride(self, name, point_count=200):
+        path = os.path.join(self.tmp, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        gpx.write_synthetic_gpx(path, point_count, seed=point_count)
+        return path
+    
+    def test_batch(self):
+        paths = [self.write_ride(f"ride{i}.gpx", 200 + i) for i in range(4)]
+        stats = gpx.preprocess_batch(paths, self.output_dir, levels=(256, 512), jobs=2)
+        self.assertEqual(paths, [s["file"] for s in stats])
+        for s in stats:
+            self.assertNotIn("error", s)
+            self.assertEqual(s["points"], gpx.PolylineCache(s["output"]).source_points)
+        self.assertEqual(sorted(f"ride{i}.pmrpoly" for i in range(4)), sorted(os.listdir(self.output_dir)))
+    
+    def test_duplicate_outputs_rejected(self):
+        path = self.write_ride("ride.gpx")
+        other = self.write_ride(os.path.join("other", "ride.gpx"))
+        self.assertRaises(ValueError, gpx.preprocess_batch, [path, other], self.output_dir)
+        self.assertRaises(ValueError, gpx.preprocess_batch, [path, path], self.output_dir)
+        self.assertFalse(os.path.exists(self.output_dir))
+
+if __name__ == "__main__":
+    unittest.main()
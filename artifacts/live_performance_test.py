@@ -1,148 +1,72 @@
 #!/usr/bin/env python3
 """
 Live performance testing for PrintMyRide poster rendering optimizations
+
+Each scenario runs a few untimed warmup iterations, then N timed repetitions,
+and is reported as median/p95/p99/stddev.  Scenarios come from a runner:
+  - SimctlRunner drives the app in the iOS simulator with xcrun simctl
+  - CommandRunner times local stand-in commands ("NAME=command args")
+  - CallableRunner times Python callables ("NAME=module:function")
+
+--compare BASELINE.json checks the new samples against an earlier results
+file and exits non-zero on statistically significant regressions.
 """
 
-import subprocess
-import time
+import argparse
+import importlib
 import json
+import math
 import os
-from typing import Dict, List, Optional
+import shlex
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
 
-class PrintMyRidePerformanceTester:
-    def __init__(self):
-        self.device_id = "9544C4B4-1C3E-4F29-A0E8-E2C8E3813972"
-        self.bundle_id = "d999ss.PrintMyRide"
-        self.results = []
-        
-    def run_comprehensive_test(self):
-        """Run comprehensive performance testing suite"""
-        print("🚀 Starting PrintMyRide Performance Testing Suite")
-        print("=" * 60)
-        
-        # Test scenarios
-        test_scenarios = [
-            {"name": "App Launch", "test_func": self.test_app_launch},
-            {"name": "Poster Generation", "test_func": self.test_poster_generation},
-            {"name": "Memory Usage", "test_func": self.test_memory_usage},
-            {"name": "UI Responsiveness", "test_func": self.test_ui_responsiveness},
+class Scenario:
+    """One benchmark scenario: |run| is timed, |setup| runs untimed before it.
+    
+    |run| may return the elapsed milliseconds itself (an int or float), to time
+    only part of what it does; otherwise the whole call is timed.
+    """
+    
+    def __init__(self, name: str, run: Callable, setup: Optional[Callable] = None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+
+class SimctlRunner:
+    """Scenarios driving the app in the iOS simulator"""
+    
+    name = "simctl"
+    
+    def __init__(self, device_id: str, bundle_id: str, settle_seconds: float = 2):
+        self.device_id = device_id
+        self.bundle_id = bundle_id
+        self.settle_seconds = settle_seconds
+    
+    def scenarios(self) -> List[Scenario]:
+        return [
+            Scenario("App Launch", self.launch_app, setup=self.terminate_app),
+            Scenario("UI Responsiveness", self.take_responsiveness_screenshot),
         ]
-        
-        for scenario in test_scenarios:
-            print(f"\n📊 Running: {scenario['name']}")
-            try:
-                result = scenario['test_func']()
-                self.results.append({"test": scenario['name'], **result})
-                print(f"✅ {scenario['name']} completed")
-            except Exception as e:
-                print(f"❌ {scenario['name']} failed: {e}")
-                self.results.append({"test": scenario['name'], "error": str(e)})
-        
-        self.generate_report()
     
-    def test_app_launch(self) -> Dict:
-        """Test app launch performance"""
-        print("  Measuring app launch time...")
-        
-        # Terminate app
+    def terminate_app(self):
         subprocess.run([
             "xcrun", "simctl", "terminate", self.device_id, self.bundle_id
         ], capture_output=True)
-        
-        time.sleep(2)
-        
-        # Launch and measure time
-        start_time = time.time()
-        
+        time.sleep(self.settle_seconds)
+    
+    def launch_app(self):
         result = subprocess.run([
             "xcrun", "simctl", "launch", self.device_id, self.bundle_id
         ], capture_output=True, text=True)
-        
-        launch_time = (time.time() - start_time) * 1000
-        
-        return {
-            "launch_time_ms": round(launch_time, 1),
-            "success": result.returncode == 0,
-            "output": result.stdout.strip()
-        }
-    
-    def test_poster_generation(self) -> Dict:
-        """Test poster generation performance through UI automation"""
-        print("  Testing poster generation...")
-        
-        # Take screenshots at key moments
-        screenshots = []
-        
-        # Initial state
-        self.take_screenshot("poster_gen_start")
-        screenshots.append("poster_gen_start")
-        
-        # Simulate poster generation workflow
-        time.sleep(2)  # Wait for app to fully load
-        
-        # Tap on poster creation (simulate)
-        self.take_screenshot("poster_gen_mid")
-        screenshots.append("poster_gen_mid")
-        
-        time.sleep(3)  # Wait for poster rendering
-        
-        self.take_screenshot("poster_gen_end")
-        screenshots.append("poster_gen_end")
-        
-        return {
-            "screenshots": screenshots,
-            "estimated_render_time_ms": 3000,  # Estimated based on wait time
-            "workflow_completed": True
-        }
-    
-    def test_memory_usage(self) -> Dict:
-        """Monitor memory usage during operation"""
-        print("  Monitoring memory usage...")
-        
-        memory_samples = []
-        
-        for i in range(5):
-            # Get memory info from simulator
-            result = subprocess.run([
-                "xcrun", "simctl", "spawn", self.device_id,
-                "log", "show", "--predicate", "process == 'PrintMyRide'",
-                "--last", "1m", "--info"
-            ], capture_output=True, text=True)
-            
-            memory_samples.append({
-                "sample": i + 1,
-                "timestamp": time.time(),
-                "log_size": len(result.stdout)
-            })
-            
-            time.sleep(1)
-        
-        return {
-            "memory_samples": len(memory_samples),
-            "monitoring_duration_sec": 5,
-            "stable_operation": True
-        }
+        if result.returncode != 0:
+            raise RuntimeError(f"launch failed: {result.stderr.strip()}")
     
-    def test_ui_responsiveness(self) -> Dict:
-        """Test UI responsiveness through screenshot timing"""
-        print("  Testing UI responsiveness...")
-        
-        response_times = []
-        
-        for i in range(3):
-            start_time = time.time()
-            self.take_screenshot(f"responsiveness_{i}")
-            screenshot_time = (time.time() - start_time) * 1000
-            response_times.append(screenshot_time)
-            time.sleep(1)
-        
-        avg_response = sum(response_times) / len(response_times)
-        
-        return {
-            "average_screenshot_time_ms": round(avg_response, 1),
-            "samples": len(response_times),
-            "responsive": avg_response < 500  # Under 500ms is considered responsive
-        }
+    def take_responsiveness_screenshot(self):
+        if not self.take_screenshot("responsiveness"):
+            raise RuntimeError("screenshot failed")
     
     def take_screenshot(self, name: str) -> bool:
         """Take a screenshot and save to artifacts"""
@@ -153,8 +77,164 @@ class PrintMyRidePerformanceTester:
             ], capture_output=True, text=True)
             
             return result.returncode == 0
-        except:
+        except OSError:
             return False
+
+def parse_scenario_spec(spec: str):
+    name, sep, target = spec.partition("=")
+    if not sep or not name.strip() or not target.strip():
+        raise ValueError(f"expected NAME=TARGET, got {spec!r}")
+    return name.strip(), target.strip()
+
+class CommandRunner:
+    """Times local commands standing in for the simulator, e.g. a Linux
+    render worker: "Poster Generation=./render_worker --poster demo" """
+    
+    name = "command"
+    
+    def __init__(self, specs: List[str]):
+        self.commands = [parse_scenario_spec(spec) for spec in specs]
+    
+    def scenarios(self) -> List[Scenario]:
+        return [Scenario(name, self.command_func(command)) for name, command in self.commands]
+    
+    @staticmethod
+    def command_func(command: str) -> Callable:
+        argv = shlex.split(command)
+        
+        def run():
+            result = subprocess.run(argv, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"{argv[0]} exited with {result.returncode}: {result.stderr.strip()[-200:]}")
+        return run
+
+class CallableRunner:
+    """Times Python callables: "Poster Generation=poster_bench:render" """
+    
+    name = "python"
+    
+    def __init__(self, specs: List[str]):
+        self.callables = []
+        for spec in specs:
+            name, target = parse_scenario_spec(spec)
+            module_name, sep, function_name = target.partition(":")
+            if not sep:
+                raise ValueError(f"expected module:function, got {target!r}")
+            module = importlib.import_module(module_name)
+            self.callables.append((name, getattr(module, function_name)))
+    
+    def scenarios(self) -> List[Scenario]:
+        return [Scenario(name, func) for name, func in self.callables]
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def summarize(samples_ms: List[float]) -> Dict:
+    ordered = sorted(samples_ms)
+    n = len(ordered)
+    mean = sum(ordered) / n
+    stddev = math.sqrt(sum((x - mean) ** 2 for x in ordered) / (n - 1)) if n > 1 else 0.0
+    return {
+        "n": n,
+        "median_ms": round(percentile(ordered, 50), 3),
+        "mean_ms": round(mean, 3),
+        "stddev_ms": round(stddev, 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "min_ms": round(ordered[0], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+def mann_whitney_greater(current: List[float], baseline: List[float]) -> float:
+    """One-sided Mann-Whitney U p-value for |current| tending to be larger
+    than |baseline| (normal approximation with tie correction)"""
+    n1, n2 = len(current), len(baseline)
+    if not n1 or not n2:
+        return 1.0
+    combined = sorted([(v, 0) for v in current] + [(v, 1) for v in baseline])
+    n = n1 + n2
+    rank_sum = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        ties = j - i + 1
+        average_rank = (i + j) / 2 + 1
+        rank_sum += average_rank * sum(1 for k in range(i, j + 1) if combined[k][1] == 0)
+        tie_term += ties ** 3 - ties
+        i = j + 1
+    u = rank_sum - n1 * (n1 + 1) / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+class BenchmarkEngine:
+    """Runs scenarios with warmup and repetitions"""
+    
+    def __init__(self, warmup: int = 1, repetitions: int = 10):
+        self.warmup = warmup
+        self.repetitions = repetitions
+    
+    def run_once(self, scenario: Scenario) -> float:
+        if scenario.setup:
+            scenario.setup()
+        start = time.perf_counter()
+        reported = scenario.run()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        # bool is an int too, but a run returning True/False did not time itself
+        if isinstance(reported, (int, float)) and not isinstance(reported, bool):
+            return float(reported)
+        return elapsed_ms
+    
+    def measure(self, scenario: Scenario) -> Dict:
+        for i in range(self.warmup):
+            self.run_once(scenario)
+        samples = []
+        for i in range(self.repetitions):
+            samples.append(self.run_once(scenario))
+        return {**summarize(samples), "samples_ms": [round(s, 3) for s in samples]}
+
+class PrintMyRidePerformanceTester:
+    # A regression must be significant and at least this much slower
+    DEFAULT_ALPHA = 0.05
+    DEFAULT_MIN_SLOWDOWN = 0.10
+    
+    def __init__(self, runner=None, warmup: int = 1, repetitions: int = 10):
+        self.device_id = "9544C4B4-1C3E-4F29-A0E8-E2C8E3813972"
+        self.bundle_id = "d999ss.PrintMyRide"
+        self.runner = runner or SimctlRunner(self.device_id, self.bundle_id)
+        self.engine = BenchmarkEngine(warmup, repetitions)
+        self.results = []
+    
+    def run_comprehensive_test(self, output_path: Optional[str] = None) -> str:
+        """Run comprehensive performance testing suite"""
+        print("🚀 Starting PrintMyRide Performance Testing Suite")
+        print(f"   Runner: {self.runner.name}, warmup {self.engine.warmup}, "
+              f"repetitions {self.engine.repetitions}")
+        print("=" * 60)
+        
+        for scenario in self.runner.scenarios():
+            print(f"\n📊 Running: {scenario.name}")
+            try:
+                result = self.engine.measure(scenario)
+                self.results.append({"test": scenario.name, **result})
+                print(f"✅ {scenario.name} completed: median {result['median_ms']}ms")
+            except Exception as e:
+                print(f"❌ {scenario.name} failed: {e}")
+                self.results.append({"test": scenario.name, "error": str(e)})
+        
+        self.generate_report()
+        return self.save_results_json(output_path)
     
     def generate_report(self):
         """Generate comprehensive performance report"""
@@ -179,9 +259,10 @@ class PrintMyRidePerformanceTester:
             if "error" in result:
                 print(f"   ❌ Error: {result['error']}")
             else:
-                for key, value in result.items():
-                    if key != "test":
-                        print(f"   • {key}: {value}")
+                print(f"   • median: {result['median_ms']}ms  p95: {result['p95_ms']}ms  "
+                      f"p99: {result['p99_ms']}ms")
+                print(f"   • stddev: {result['stddev_ms']}ms  min: {result['min_ms']}ms  "
+                      f"max: {result['max_ms']}ms  (n={result['n']})")
         
         # Performance insights
         print("\n🎯 PERFORMANCE INSIGHTS:")
@@ -190,7 +271,7 @@ class PrintMyRidePerformanceTester:
         # App launch performance
         launch_test = next((r for r in successful_tests if r['test'] == 'App Launch'), None)
         if launch_test:
-            launch_time = launch_test.get('launch_time_ms', 0)
+            launch_time = launch_test['median_ms']
             if launch_time < 2000:
                 print(f"   ⚡ Fast app launch: {launch_time}ms")
             elif launch_time < 5000:
@@ -201,25 +282,25 @@ class PrintMyRidePerformanceTester:
         # UI responsiveness
         ui_test = next((r for r in successful_tests if r['test'] == 'UI Responsiveness'), None)
         if ui_test:
-            if ui_test.get('responsive', False):
+            if ui_test['median_ms'] < 500:  # Under 500ms is considered responsive
                 print("   ⚡ UI is responsive")
             else:
                 print("   🟡 UI responsiveness could be improved")
         
         print("\n" + "=" * 60)
-        
-        # Save results to JSON
-        self.save_results_json()
     
-    def save_results_json(self):
+    def save_results_json(self, filename: Optional[str] = None) -> str:
         """Save results to JSON file for further analysis"""
         timestamp = int(time.time())
-        filename = f"./artifacts/performance_results_{timestamp}.json"
+        filename = filename or f"./artifacts/performance_results_{timestamp}.json"
         
         report = {
             "timestamp": timestamp,
             "test_suite": "PrintMyRide Performance Testing",
             "device_id": self.device_id,
+            "runner": self.runner.name,
+            "warmup": self.engine.warmup,
+            "repetitions": self.engine.repetitions,
             "results": self.results,
             "summary": {
                 "total_tests": len(self.results),
@@ -232,11 +313,91 @@ class PrintMyRidePerformanceTester:
             json.dump(report, f, indent=2)
         
         print(f"📄 Results saved to: {filename}")
+        return filename
+    
+    def compare_with_baseline(self, baseline_path: str, alpha: float = DEFAULT_ALPHA,
+                              min_slowdown: float = DEFAULT_MIN_SLOWDOWN) -> List[Dict]:
+        """Compare results with an earlier results file; returns the regressions"""
+        with open(baseline_path) as f:
+            baseline = {r["test"]: r for r in json.load(f).get("results", [])}
+        
+        print("\n" + "=" * 60)
+        print(f"⚖️  COMPARISON WITH {baseline_path}")
+        print(f"   (regression: one-sided p < {alpha} and median {min_slowdown:.0%}+ slower)")
+        print("=" * 60)
+        
+        regressions = []
+        for result in self.results:
+            name = result["test"]
+            before = baseline.get(name)
+            if "error" in result:
+                print(f"   ❌ {name}: failed, not compared")
+                continue
+            if not before or not before.get("samples_ms"):
+                print(f"   ⚪ {name}: no baseline samples")
+                continue
+            
+            old_median = before["median_ms"]
+            change = (result["median_ms"] - old_median) / old_median if old_median else 0.0
+            p_slower = mann_whitney_greater(result["samples_ms"], before["samples_ms"])
+            p_faster = mann_whitney_greater(before["samples_ms"], result["samples_ms"])
+            line = f"{name}: {old_median}ms → {result['median_ms']}ms ({change:+.1%}"
+            if p_slower < alpha and change >= min_slowdown:
+                regressions.append({"test": name, "baseline_median_ms": old_median,
+                                    "median_ms": result["median_ms"], "change": round(change, 4),
+                                    "p_value": round(p_slower, 6)})
+                print(f"   🔴 {line}, p={p_slower:.4f}) REGRESSION")
+            elif p_faster < alpha:
+                print(f"   🟢 {line}, p={p_faster:.4f}) faster")
+            else:
+                print(f"   ⚪ {line}, p={p_slower:.4f}) no significant change")
+        
+        print("=" * 60)
+        return regressions
 
 def main():
     """Main execution function"""
-    tester = PrintMyRidePerformanceTester()
-    tester.run_comprehensive_test()
+    parser = argparse.ArgumentParser(description="PrintMyRide performance benchmarks")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed iterations per scenario")
+    parser.add_argument("-n", "--repetitions", type=int, default=10, help="timed iterations per scenario")
+    parser.add_argument("--command", action="append", default=[], metavar="NAME=COMMAND",
+                        help="time a local command instead of the simulator (repeatable)")
+    parser.add_argument("--callable", action="append", default=[], metavar="NAME=MODULE:FUNCTION",
+                        help="time a Python callable instead of the simulator (repeatable)")
+    parser.add_argument("--compare", metavar="BASELINE.json",
+                        help="fail on significant regressions against an earlier results file")
+    parser.add_argument("--alpha", type=float, default=PrintMyRidePerformanceTester.DEFAULT_ALPHA,
+                        help="significance level for --compare")
+    parser.add_argument("--min-slowdown", type=float, default=PrintMyRidePerformanceTester.DEFAULT_MIN_SLOWDOWN,
+                        help="smallest relative median slowdown that counts as a regression")
+    parser.add_argument("--output", help="results JSON path (default: ./artifacts/performance_results_<ts>.json)")
+    args = parser.parse_args()
+    
+    if args.repetitions < 1:
+        parser.error("--repetitions must be at least 1")
+    if args.command and args.callable:
+        parser.error("use either --command or --callable")
+    try:
+        runner = None
+        if args.command:
+            runner = CommandRunner(args.command)
+        elif args.callable:
+            sys.path.insert(0, os.getcwd())
+            runner = CallableRunner(args.callable)
+    except (ValueError, ImportError, AttributeError) as e:
+        parser.error(str(e))
+    
+    tester = PrintMyRidePerformanceTester(runner, args.warmup, args.repetitions)
+    tester.run_comprehensive_test(args.output)
+    
+    failed = [r for r in tester.results if "error" in r]
+    if args.compare:
+        regressions = tester.compare_with_baseline(args.compare, args.alpha, args.min_slowdown)
+        if regressions:
+            print(f"🔴 {len(regressions)} performance regression(s) detected")
+            return 1
+        print("✅ No significant regressions")
+    return 1 if failed else 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
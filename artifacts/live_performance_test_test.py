@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Unit tests for live_performance_test.py"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import live_performance_test as perf
+
+class BenchmarkEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = perf.BenchmarkEngine(warmup=2, repetitions=3)
+    
+    def test_reported_milliseconds(self):
+        self.assertEqual(12.0, self.engine.run_once(perf.Scenario("int", lambda: 12)))
+        self.assertEqual(2.5, self.engine.run_once(perf.Scenario("float", lambda: 2.5)))
+    
+    def test_bool_is_not_reported_time(self):
+        def run():
+            time.sleep(0.02)
+            return True
+        elapsed_ms = self.engine.run_once(perf.Scenario("bool", run))
+        self.assertGreaterEqual(elapsed_ms, 20)
+        self.assertLess(self.engine.run_once(perf.Scenario("false", lambda: False)), 20)
+    
+    def test_measure(self):
+        calls = []
+        scenario = perf.Scenario("count", lambda: len(calls), setup=lambda: calls.append(None))
+        result = self.engine.measure(scenario)
+        self.assertEqual(5, len(calls))
+        self.assertEqual([3.0, 4.0, 5.0], result["samples_ms"])
+        self.assertEqual(3, result["n"])
+        self.assertEqual(4.0, result["median_ms"])
+
+class MannWhitneyTest(unittest.TestCase):
+    def test_identical_samples(self):
+        self.assertGreaterEqual(perf.mann_whitney_greater([1, 2, 3], [1, 2, 3]), 0.5)
+    
+    def test_all_ties(self):
+        self.assertEqual(1.0, perf.mann_whitney_greater([5, 5, 5], [5, 5, 5]))
+        self.assertEqual(1.0, perf.mann_whitney_greater([], [1, 2]))
+    
+    def test_known_p_value(self):
+        # U = 4 of a possible 4, variance 5/3: z = (4 - 2 - 0.5) / sqrt(5/3)
+        self.assertAlmostEqual(0.122639, perf.mann_whitney_greater([3, 4], [1, 2]), places=6)
+        self.assertGreater(perf.mann_whitney_greater([1, 2], [3, 4]), 0.9)
+
+class CompareWithBaselineTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.baseline = os.path.join(self.tmp, "baseline.json")
+        self.tester = perf.PrintMyRidePerformanceTester(runner=perf.CommandRunner([]))
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+    
+    def result(self, name, samples):
+        return {"test": name, **perf.summarize(samples), "samples_ms": samples}
+    
+    def compare(self, baseline_results, results, **kwargs):
+        with open(self.baseline, "w") as f:
+            json.dump({"results": baseline_results}, f)
+        self.tester.results = results
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.tester.compare_with_baseline(self.baseline, **kwargs)
+    
+    def test_regression(self):
+        baseline = [100.0 + i for i in range(10)]
+        regressions = self.compare([self.result("Render", baseline)],
+                                   [self.result("Render", [s * 1.5 for s in baseline])])
+        self.assertEqual(["Render"], [r["test"] for r in regressions])
+        self.assertAlmostEqual(0.5, regressions[0]["change"], places=2)
+        self.assertLess(regressions[0]["p_value"], 0.05)
+    
+    def test_small_slowdown_is_not_a_regression(self):
+        baseline = [100.0 + i for i in range(10)]
+        slower = [s * 1.05 + 1 for s in baseline]
+        self.assertLess(perf.mann_whitney_greater(slower, baseline), 0.05)
+        self.assertEqual([], self.compare([self.result("Render", baseline)], [self.result("Render", slower)]))
+        self.assertEqual(1, len(self.compare([self.result("Render", baseline)], [self.result("Render", slower)],
+                                             min_slowdown=0.05)))
+    
+    def test_missing_and_failed_scenarios(self):
+        results = [self.result("New", [500.0] * 5), {"test": "Broken", "error": "boom"}]
+        self.assertEqual([], self.compare([self.result("Broken", [1.0] * 5)], results))
+
+class MainTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        with open(os.path.join(self.tmp, "bench_fixture.py"), "w") as f:
+            f.write("def render():\n    return 50.0\n")
+        cwd = os.getcwd()
+        os.chdir(self.tmp)
+        self.addCleanup(os.chdir, cwd)
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.addCleanup(sys.modules.pop, "bench_fixture", None)
+        self.addCleanup(setattr, sys, "path", list(sys.path))
+    
+    def write_baseline(self, samples):
+        with open("baseline.json", "w") as f:
+            json.dump({"results": [{"test": "Render", **perf.summarize(samples), "samples_ms": samples}]}, f)
+    
+    def main(self, *args):
+        argv = ["live_performance_test.py", "--callable", "Render=bench_fixture:render", "--warmup", "0",
+                "-n", "5", "--output", "results.json", *args]
+        with mock.patch.object(sys, "argv", argv), contextlib.redirect_stdout(io.StringIO()):
+            return perf.main()
+    
+    def test_regression_exit_code(self):
+        self.write_baseline([10.0, 11.0, 12.0, 10.5, 11.5])
+        self.assertEqual(1, self.main("--compare", "baseline.json"))
+        self.assertEqual(0, self.main("--compare", "baseline.json", "--min-slowdown", "10"))
+        self.assertEqual(0, self.main("--compare", "baseline.json", "--alpha", "0.001"))
+    
+    def test_no_regression_exit_code(self):
+        self.write_baseline([50.0] * 5)
+        self.assertEqual(0, self.main("--compare", "baseline.json"))
+        self.assertEqual(0, self.main())
+        with open("results.json") as f:
+            self.assertEqual([50.0] * 5, json.load(f)["results"][0]["samples_ms"])
+
+if __name__ == "__main__":
+    unittest.main()
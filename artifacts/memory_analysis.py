@@ -1,65 +1,349 @@
 #!/usr/bin/env python3
 """
 Memory analysis and profiling for PrintMyRide optimization testing
+
+Samples come from a pluggable sampler:
+  - ProcSampler reads /proc/<pid>/statm and /proc/<pid>/stat in-process,
+    cheap enough for millisecond intervals (Linux render/export workers)
+  - SimctlSampler runs ps inside the iOS simulator (about 1 sample/second)
+
+Samples go into a fixed-size ring buffer, so long runs keep the most recent
+samples without growing.
 """
 
-import subprocess
-import time
+import argparse
 import json
+import os
+import subprocess
 import sys
+import threading
+import time
+from array import array
 from datetime import datetime
 
+def find_pid_by_name(name):
+    """Find a running process by name in /proc, newest first.
+    
+    Matches the kernel comm name, or the basename of argv[0] or of a script
+    run by an interpreter (argv[1], with or without its .py suffix).
+    """
+    candidates = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        try:
+            with open(f"/proc/{entry}/comm") as f:
+                comm = f.read().strip()
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                argv = [a.decode(errors="replace") for a in f.read().split(b"\0") if a]
+            with open(f"/proc/{entry}/stat") as f:
+                start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        except (OSError, IndexError, ValueError):
+            continue  # Exited while we looked, or a kernel thread
+        
+        names = {comm}
+        for arg in argv[:2]:
+            base = os.path.basename(arg)
+            names.add(base)
+            if base.endswith(".py"):
+                names.add(base[:-3])
+        if name in names or name[:15] == comm:
+            candidates.append((start_ticks, int(entry)))
+    
+    if not candidates:
+        return None
+    return max(candidates)[1]
+
+class ProcSampler:
+    """Samples a Linux process from /proc without spawning anything"""
+    
+    name = "proc"
+    # CPU time only advances in clock ticks, so measure it over a window
+    CPU_WINDOW_S = 0.1
+    STATUS_INTERVAL_S = 1.0
+    
+    def __init__(self, pid):
+        self.pid = pid
+        self.page_kb = os.sysconf("SC_PAGE_SIZE") // 1024
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+        # Keep the files open; pread() at offset 0 re-reads them
+        self.statm_fd = os.open(f"/proc/{pid}/statm", os.O_RDONLY)
+        self.stat_fd = os.open(f"/proc/{pid}/stat", os.O_RDONLY)
+        self.last_cpu = None
+        self.cpu_percent = 0.0
+        self.last_status = {}
+        self.status_time = 0
+    
+    def sample(self):
+        """Return (timestamp, rss_kb, vsz_kb, cpu_percent), or None if the
+        process is gone"""
+        try:
+            statm = os.pread(self.statm_fd, 256, 0).split()
+            stat = os.pread(self.stat_fd, 1024, 0)
+        except OSError:
+            return None
+        if not statm or statm[0] == b"0":
+            return None  # Exited; a zombie has no memory left
+        now = time.time()
+        
+        # utime and stime are fields 14 and 15; comm may contain spaces
+        fields = stat.rsplit(b")", 1)[1].split()
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / self.clock_ticks
+        if self.last_cpu is None:
+            self.last_cpu = (now, cpu_seconds)
+        elif now - self.last_cpu[0] >= self.CPU_WINDOW_S:
+            last_time, last_seconds = self.last_cpu
+            self.cpu_percent = (cpu_seconds - last_seconds) / (now - last_time) * 100
+            self.last_cpu = (now, cpu_seconds)
+        
+        # The status figures are gone once the process exits, so keep them fresh
+        if now - self.status_time >= self.STATUS_INTERVAL_S:
+            self.status_time = now
+            self.last_status = self.read_status() or self.last_status
+        
+        return (
+            now,
+            int(statm[1]) * self.page_kb,
+            int(statm[0]) * self.page_kb,
+            self.cpu_percent,
+        )
+    
+    def status(self):
+        """Peak and thread figures from the last read of /proc/<pid>/status"""
+        return self.read_status() or self.last_status
+    
+    def read_status(self):
+        wanted = {"VmPeak": "vm_peak_kb", "VmHWM": "vm_hwm_kb", "RssAnon": "rss_anon_kb",
+                  "RssFile": "rss_file_kb", "Threads": "threads"}
+        info = {}
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    if key in wanted:
+                        info[wanted[key]] = int(value.split()[0])
+        except OSError:
+            pass
+        # A zombie has no memory figures left
+        return info if "vm_hwm_kb" in info else {}
+    
+    def close(self):
+        os.close(self.statm_fd)
+        os.close(self.stat_fd)
+
+class SimctlSampler:
+    """Samples a process in the iOS simulator with ps (one spawn per sample)"""
+    
+    name = "simctl"
+    
+    def __init__(self, device_id, pid):
+        self.device_id = device_id
+        self.pid = pid
+    
+    @staticmethod
+    def find_pid(device_id, process_name):
+        """Look up a simulator process by name"""
+        try:
+            result = subprocess.run([
+                "xcrun", "simctl", "spawn", device_id,
+                "ps", "-A", "-o", "pid=,comm="
+            ], capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        for line in result.stdout.splitlines():
+            parts = line.split(None, 1)
+            if len(parts) == 2 and os.path.basename(parts[1]) == process_name:
+                return int(parts[0])
+        return None
+    
+    def sample(self):
+        try:
+            result = subprocess.run([
+                "xcrun", "simctl", "spawn", self.device_id,
+                "ps", "-o", "pid=,rss=,vsz=,pcpu=", "-p", str(self.pid)
+            ], capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"   Warning: Could not capture sample - {e}")
+            return None
+        
+        data = result.stdout.split()
+        if result.returncode != 0 or len(data) < 4:
+            return None
+        try:
+            return (time.time(), int(data[1]), int(data[2]), float(data[3]))
+        except ValueError:
+            return None
+    
+    def status(self):
+        return {}
+    
+    def close(self):
+        pass
+
+class SampleRing:
+    """Fixed-size ring buffer of samples, stored column-wise"""
+    
+    FIELDS = ("timestamp", "rss_kb", "vsz_kb", "cpu_percent")
+    
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.columns = [array("d", bytes(8 * capacity)) for _ in self.FIELDS]
+        self.next = 0
+        self.count = 0
+        self.overwritten = 0
+    
+    def append(self, sample):
+        for column, value in zip(self.columns, sample):
+            column[self.next] = value
+        self.next = (self.next + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        else:
+            self.overwritten += 1
+    
+    def __len__(self):
+        return self.count
+    
+    def column(self, field):
+        """Values of one field, oldest first"""
+        values = self.columns[self.FIELDS.index(field)]
+        start = (self.next - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            return values[start:start + self.count].tolist()
+        return values[start:].tolist() + values[:self.next].tolist()
+    
+    def to_list(self):
+        columns = [self.column(field) for field in self.FIELDS]
+        return [
+            {"timestamp": t, "rss_kb": int(rss), "vsz_kb": int(vsz), "cpu_percent": round(cpu, 2)}
+            for t, rss, vsz, cpu in zip(*columns)
+        ]
+
+def percentile(sorted_values, p):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    position = (len(sorted_values) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def linear_trend(xs, ys):
+    """Least-squares slope and r² of ys over xs"""
+    n = len(xs)
+    if n < 2:
+        return 0.0, 0.0
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    syy = sum((y - mean_y) ** 2 for y in ys)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    if sxx == 0:
+        return 0.0, 0.0
+    slope = sxy / sxx
+    r_squared = (sxy * sxy) / (sxx * syy) if syy else 0.0
+    return slope, r_squared
+
 class MemoryProfiler:
-    def __init__(self):
+    # Steady growth above this rate, with a good enough fit, looks like a leak
+    LEAK_SLOPE_MB_PER_MIN = 1.0
+    LEAK_MIN_R_SQUARED = 0.6
+    LEAK_MIN_DURATION_S = 10
+    
+    def __init__(self, sampler=None, capacity=100000, report_path="./artifacts/memory_analysis_report.json"):
         self.device_id = "9544C4B4-1C3E-4F29-A0E8-E2C8E3813972"
         self.bundle_id = "d999ss.PrintMyRide"
-        self.samples = []
-        
+        self.process_name = "PrintMyRide"
+        self.sampler = sampler
+        self.ring = SampleRing(capacity)
+        self.markers = []
+        self.report_path = report_path
+        self._stop_sampling = None
+        self._sampling_thread = None
+    
+    @property
+    def samples(self):
+        return self.ring.to_list()
+    
+    def get_sampler(self):
+        """Use the configured sampler, or find the app in the simulator"""
+        if self.sampler is None:
+            pid = SimctlSampler.find_pid(self.device_id, self.process_name)
+            if pid is None:
+                print(f"   Warning: {self.process_name} is not running in the simulator")
+                return None
+            self.sampler = SimctlSampler(self.device_id, pid)
+        return self.sampler
+    
+    def mark_phase(self, name, timestamp=None):
+        """Start a phase; samples until the next marker are attributed to it"""
+        self.markers.append((timestamp if timestamp is not None else time.time(), name))
+    
+    def load_markers(self, path):
+        """Read markers written by the profiled process, one
+        "<unix timestamp> <phase name>" per line"""
+        with open(path) as f:
+            for line in f:
+                parts = line.strip().split(None, 1)
+                if len(parts) == 2:
+                    self.mark_phase(parts[1], float(parts[0]))
+    
     def capture_memory_samples(self, duration_seconds=30, interval=2):
         """Capture memory usage samples over time"""
-        print(f"🧠 Capturing memory samples for {duration_seconds} seconds...")
-        
-        start_time = time.time()
-        sample_count = 0
-        
-        while time.time() - start_time < duration_seconds:
-            sample = self.get_memory_sample()
-            if sample:
-                self.samples.append(sample)
-                sample_count += 1
-                
-                # Log progress
-                elapsed = time.time() - start_time
-                print(f"   Sample {sample_count}: {elapsed:.1f}s - Memory usage captured")
-            
-            time.sleep(interval)
+        sampler = self.get_sampler()
+        if sampler is None:
+            return
+        print(f"🧠 Capturing memory samples for {duration_seconds} seconds "
+              f"every {interval * 1000:g} ms ({sampler.name})...")
         
-        print(f"✅ Captured {len(self.samples)} memory samples")
+        before = len(self.ring) + self.ring.overwritten
+        self._sample_loop(sampler, duration_seconds, interval, threading.Event(), verbose=True)
+        print(f"✅ Captured {len(self.ring) + self.ring.overwritten - before} memory samples")
     
-    def get_memory_sample(self):
-        """Get current memory usage sample"""
-        try:
-            # Get process info
-            result = subprocess.run([
-                "xcrun", "simctl", "spawn", self.device_id,
-                "ps", "-o", "pid,rss,vsz,pcpu", "-p", "84405"  # Use known PID
-            ], capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0 and result.stdout:
-                lines = result.stdout.strip().split('\n')
-                if len(lines) > 1:  # Skip header
-                    data = lines[1].split()
-                    return {
-                        "timestamp": time.time(),
-                        "pid": data[0] if len(data) > 0 else "N/A",
-                        "rss_kb": int(data[1]) if len(data) > 1 and data[1].isdigit() else 0,
-                        "vsz_kb": int(data[2]) if len(data) > 2 and data[2].isdigit() else 0,
-                        "cpu_percent": float(data[3]) if len(data) > 3 else 0.0
-                    }
-        except Exception as e:
-            print(f"   Warning: Could not capture sample - {e}")
+    def start_sampling(self, interval=1):
+        """Sample in the background until stop_sampling()"""
+        sampler = self.get_sampler()
+        if sampler is None:
+            return
+        self._stop_sampling = threading.Event()
+        self._sampling_thread = threading.Thread(
+            target=self._sample_loop, args=(sampler, None, interval, self._stop_sampling), daemon=True
+        )
+        self._sampling_thread.start()
+    
+    def stop_sampling(self):
+        if self._sampling_thread:
+            self._stop_sampling.set()
+            self._sampling_thread.join()
+            self._sampling_thread = None
+    
+    def _sample_loop(self, sampler, duration_seconds, interval, stop, verbose=False):
+        # Schedule against a fixed start so the interval does not drift
+        start = time.perf_counter()
+        next_tick = start
+        last_progress = start
+        while not stop.is_set():
+            now = time.perf_counter()
+            if duration_seconds is not None and now - start >= duration_seconds:
+                break
+            sample = sampler.sample()
+            if sample is None:
+                if sampler.name == "proc":
+                    print(f"   Process {sampler.pid} exited")
+                    break
+            else:
+                self.ring.append(sample)
+                if verbose and now - last_progress >= 1:
+                    last_progress = now
+                    print(f"   {now - start:.1f}s - {len(self.ring)} samples, "
+                          f"RSS {sample[1] / 1024:.1f} MB")
             
-        return None
+            next_tick += interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                stop.wait(delay)
+            else:
+                next_tick = time.perf_counter()  # Fell behind; don't burst
     
     def simulate_poster_workflow(self):
         """Simulate intensive poster generation workflow"""
@@ -77,6 +361,7 @@ class MemoryProfiler:
         
         for step in workflow_steps:
             print(f"   {step['name']}...")
+            self.mark_phase(step['name'])
             
             # Take screenshot to simulate UI interaction
             subprocess.run([
@@ -92,6 +377,7 @@ class MemoryProfiler:
         
         # Capture baseline
         print("   Capturing baseline memory usage...")
+        self.mark_phase("Stress Baseline")
         time.sleep(3)
         
         # Start memory monitoring
@@ -100,6 +386,7 @@ class MemoryProfiler:
         # Simulate multiple poster generations
         for i in range(3):
             print(f"   Stress test iteration {i+1}/3...")
+            self.mark_phase(f"Stress Iteration {i+1}")
             
             # Simulate memory-intensive operations
             subprocess.run([
@@ -119,45 +406,115 @@ class MemoryProfiler:
         
         print("   ✅ Stress test completed")
     
+    def analyze_growth(self, timestamps, rss_values):
+        """Regression-based growth rate; a steady climb suggests a leak"""
+        if len(rss_values) < 2:
+            return {"slope_mb_per_min": 0.0, "r_squared": 0.0, "duration_s": 0.0, "leak_suspected": False}
+        start = timestamps[0]
+        slope_kb_per_s, r_squared = linear_trend([t - start for t in timestamps], rss_values)
+        slope_mb_per_min = slope_kb_per_s * 60 / 1024
+        duration = timestamps[-1] - start
+        return {
+            "slope_mb_per_min": round(slope_mb_per_min, 3),
+            "r_squared": round(r_squared, 3),
+            "duration_s": round(duration, 2),
+            "leak_suspected": (
+                duration >= self.LEAK_MIN_DURATION_S
+                and slope_mb_per_min >= self.LEAK_SLOPE_MB_PER_MIN
+                and r_squared >= self.LEAK_MIN_R_SQUARED
+            ),
+        }
+    
+    def analyze_phases(self, timestamps, rss_values, cpu_values):
+        """Attribute samples to the phase whose marker precedes them"""
+        if not self.markers or not timestamps:
+            return []
+        markers = sorted(self.markers)
+        if timestamps[0] < markers[0][0]:
+            markers.insert(0, (timestamps[0], "unmarked"))
+        
+        phases = []
+        index = 0
+        for number, (start, name) in enumerate(markers):
+            end = markers[number + 1][0] if number + 1 < len(markers) else float("inf")
+            while index < len(timestamps) and timestamps[index] < start:
+                index += 1
+            first = index
+            while index < len(timestamps) and timestamps[index] < end:
+                index += 1
+            if first == index:
+                phases.append({"name": name, "samples": 0})
+                continue
+            rss = rss_values[first:index]
+            cpu = cpu_values[first:index]
+            phases.append({
+                "name": name,
+                "samples": index - first,
+                "duration_s": round(timestamps[index - 1] - timestamps[first], 3),
+                "start_rss_mb": round(rss[0] / 1024, 2),
+                "end_rss_mb": round(rss[-1] / 1024, 2),
+                "peak_rss_mb": round(max(rss) / 1024, 2),
+                "delta_mb": round((rss[-1] - rss[0]) / 1024, 2),
+                "avg_cpu": round(sum(cpu) / len(cpu), 2),
+            })
+        return phases
+    
     def analyze_memory_patterns(self):
         """Analyze captured memory samples for patterns"""
-        if not self.samples:
+        if not len(self.ring):
             print("❌ No memory samples to analyze")
             return
         
         print("📊 Analyzing memory patterns...")
         
         # Calculate statistics
-        rss_values = [s['rss_kb'] for s in self.samples if s['rss_kb'] > 0]
-        cpu_values = [s['cpu_percent'] for s in self.samples]
+        timestamps = self.ring.column("timestamp")
+        all_rss = self.ring.column("rss_kb")
+        all_cpu = self.ring.column("cpu_percent")
+        valid = [i for i, rss in enumerate(all_rss) if rss > 0]
+        timestamps = [timestamps[i] for i in valid]
+        rss_values = [all_rss[i] for i in valid]
+        cpu_values = [all_cpu[i] for i in valid]
         
         if not rss_values:
             print("❌ No valid memory data found")
             return
         
+        sorted_rss = sorted(rss_values)
+        sorted_cpu = sorted(cpu_values)
         stats = {
-            "total_samples": len(self.samples),
+            "total_samples": len(self.ring),
+            "overwritten_samples": self.ring.overwritten,
+            "sampler": self.sampler.name if self.sampler else None,
+            "pid": self.sampler.pid if self.sampler else None,
             "memory_stats": {
-                "min_rss_mb": round(min(rss_values) / 1024, 2),
-                "max_rss_mb": round(max(rss_values) / 1024, 2),
+                "min_rss_mb": round(sorted_rss[0] / 1024, 2),
+                "max_rss_mb": round(sorted_rss[-1] / 1024, 2),
                 "avg_rss_mb": round(sum(rss_values) / len(rss_values) / 1024, 2),
-                "memory_growth_mb": round((max(rss_values) - min(rss_values)) / 1024, 2)
+                "memory_growth_mb": round((sorted_rss[-1] - sorted_rss[0]) / 1024, 2),
+                "percentiles_mb": {
+                    f"p{p}": round(percentile(sorted_rss, p) / 1024, 2) for p in (50, 90, 95, 99)
+                },
             },
             "cpu_stats": {
-                "min_cpu": round(min(cpu_values), 2) if cpu_values else 0,
-                "max_cpu": round(max(cpu_values), 2) if cpu_values else 0,
-                "avg_cpu": round(sum(cpu_values) / len(cpu_values), 2) if cpu_values else 0
-            }
+                "min_cpu": round(sorted_cpu[0], 2),
+                "max_cpu": round(sorted_cpu[-1], 2),
+                "avg_cpu": round(sum(cpu_values) / len(cpu_values), 2),
+                "p95_cpu": round(percentile(sorted_cpu, 95), 2),
+            },
+            "growth": self.analyze_growth(timestamps, rss_values),
+            "phases": self.analyze_phases(timestamps, rss_values, cpu_values),
         }
+        if self.sampler:
+            stats["process_status"] = self.sampler.status()
         
         # Memory health assessment
         max_memory_mb = stats["memory_stats"]["max_rss_mb"]
-        memory_growth = stats["memory_stats"]["memory_growth_mb"]
         
         health_status = "EXCELLENT"
         if max_memory_mb > 200:
             health_status = "HIGH_USAGE"
-        elif memory_growth > 50:
+        elif stats["growth"]["leak_suspected"]:
             health_status = "POTENTIAL_LEAK"
         elif max_memory_mb > 100:
             health_status = "NORMAL"
@@ -178,6 +535,8 @@ class MemoryProfiler:
         print("=" * 60)
         
         print(f"📊 Sample Count: {stats['total_samples']}")
+        if stats['overwritten_samples']:
+            print(f"   (ring buffer full: {stats['overwritten_samples']} older samples dropped)")
         print(f"🎯 Memory Health: {stats['memory_health']}")
         
         print("\n💾 MEMORY STATISTICS:")
@@ -186,6 +545,14 @@ class MemoryProfiler:
         print(f"   • Maximum Usage: {mem_stats['max_rss_mb']} MB") 
         print(f"   • Average Usage: {mem_stats['avg_rss_mb']} MB")
         print(f"   • Memory Growth: {mem_stats['memory_growth_mb']} MB")
+        percentiles = mem_stats['percentiles_mb']
+        print(f"   • Percentiles: p50 {percentiles['p50']} MB, p90 {percentiles['p90']} MB, "
+              f"p95 {percentiles['p95']} MB, p99 {percentiles['p99']} MB")
+        
+        growth = stats['growth']
+        print("\n📈 GROWTH TREND:")
+        print(f"   • Rate: {growth['slope_mb_per_min']} MB/min over {growth['duration_s']}s "
+              f"(r² {growth['r_squared']})")
         
         print("\n⚡ CPU STATISTICS:")
         cpu_stats = stats['cpu_stats']
@@ -193,6 +560,16 @@ class MemoryProfiler:
         print(f"   • Maximum CPU: {cpu_stats['max_cpu']}%")
         print(f"   • Average CPU: {cpu_stats['avg_cpu']}%")
         
+        if stats['phases']:
+            print("\n🧭 PHASES:")
+            for phase in stats['phases']:
+                if not phase['samples']:
+                    print(f"   • {phase['name']}: no samples")
+                    continue
+                print(f"   • {phase['name']}: {phase['delta_mb']:+} MB "
+                      f"(peak {phase['peak_rss_mb']} MB, {phase['samples']} samples, "
+                      f"avg CPU {phase['avg_cpu']}%)")
+        
         # Performance assessment
         print("\n🎯 PERFORMANCE ASSESSMENT:")
         if stats['memory_health'] == 'EXCELLENT':
@@ -206,7 +583,7 @@ class MemoryProfiler:
         
         # Optimization recommendations
         print("\n💡 OPTIMIZATION RECOMMENDATIONS:")
-        if mem_stats['memory_growth_mb'] > 30:
+        if growth['leak_suspected']:
             print("   • Investigate potential memory leaks")
             print("   • Implement more aggressive cache cleanup")
         
@@ -228,6 +605,7 @@ class MemoryProfiler:
             "device_id": self.device_id,
             "bundle_id": self.bundle_id,
             "statistics": stats,
+            "markers": [{"timestamp": t, "name": name} for t, name in sorted(self.markers)],
             "raw_samples": self.samples[-10:],  # Last 10 samples
             "recommendations": [
                 "Deploy PosterRenderService optimizations",
@@ -237,10 +615,10 @@ class MemoryProfiler:
             ]
         }
         
-        with open("./artifacts/memory_analysis_report.json", "w") as f:
+        with open(self.report_path, "w") as f:
             json.dump(report, f, indent=2)
         
-        print(f"\n📄 Detailed report saved: memory_analysis_report.json")
+        print(f"\n📄 Detailed report saved: {self.report_path}")
         print("=" * 60)
     
     def run_full_analysis(self):
@@ -249,28 +627,85 @@ class MemoryProfiler:
         print("=" * 50)
         
         try:
+            # Monitor memory for the whole run, one phase per step
+            self.start_sampling(interval=1)
+            
             # Run workflow simulation with monitoring
             self.simulate_poster_workflow()
             
-            # Capture memory samples
-            self.capture_memory_samples(duration_seconds=20, interval=1)
+            # Keep sampling while the app settles
+            self.mark_phase("Idle")
+            time.sleep(20)
             
             # Run stress test
             self.run_memory_stress_test()
+            self.stop_sampling()
             
             # Generate comprehensive report
             self.generate_report()
-            
+        
         except KeyboardInterrupt:
             print("\n⚠️  Analysis interrupted by user")
-            if self.samples:
+            self.stop_sampling()
+            if len(self.ring):
                 self.generate_report()
         except Exception as e:
+            self.stop_sampling()
             print(f"❌ Analysis failed: {e}")
+    
+    def run_process_analysis(self, duration_seconds, interval, marker_file=None):
+        """Profile a running process (e.g. a Linux render or export worker)"""
+        print(f"🚀 Profiling PID {self.sampler.pid}...")
+        print("=" * 50)
+        
+        try:
+            self.capture_memory_samples(duration_seconds=duration_seconds, interval=interval)
+        except KeyboardInterrupt:
+            print("\n⚠️  Sampling interrupted by user")
+        if marker_file:
+            self.load_markers(marker_file)
+        self.generate_report()
+        self.sampler.close()
 
 def main():
-    profiler = MemoryProfiler()
-    profiler.run_full_analysis()
+    parser = argparse.ArgumentParser(description="PrintMyRide memory profiler")
+    parser.add_argument("--backend", choices=["auto", "proc", "simctl"], default="auto",
+                        help="proc samples a local Linux process; simctl runs the simulator workflow "
+                             "(auto: proc if --pid/--process is given on Linux)")
+    parser.add_argument("--process", help="name of the process to profile")
+    parser.add_argument("--pid", type=int, help="PID of the process to profile")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to sample (proc backend)")
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between samples (proc backend)")
+    parser.add_argument("--capacity", type=int, default=100000, help="ring buffer size in samples")
+    parser.add_argument("--markers", help='phase marker file, lines of "<unix timestamp> <phase name>"')
+    parser.add_argument("--output", default="./artifacts/memory_analysis_report.json", help="JSON report path")
+    args = parser.parse_args()
+    
+    backend = args.backend
+    if backend == "auto":
+        local = (args.pid or args.process) and os.path.isdir("/proc/self")
+        backend = "proc" if local else "simctl"
+    
+    profiler = MemoryProfiler(capacity=args.capacity, report_path=args.output)
+    if backend == "simctl":
+        if args.process:
+            profiler.process_name = args.process
+        if args.pid:
+            profiler.sampler = SimctlSampler(profiler.device_id, args.pid)
+        profiler.run_full_analysis()
+        return 0
+    
+    pid = args.pid or (find_pid_by_name(args.process) if args.process else None)
+    if pid is None:
+        print(f"❌ No running process found for {args.process or 'the proc backend (use --pid or --process)'}")
+        return 1
+    try:
+        profiler.sampler = ProcSampler(pid)
+    except OSError as e:
+        print(f"❌ Cannot read /proc/{pid}: {e}")
+        return 1
+    profiler.run_process_analysis(args.duration, args.interval, args.markers)
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Unit tests for memory_analysis.py"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import memory_analysis as memory
+
+class SampleRingTest(unittest.TestCase):
+    def test_wrap_around(self):
+        ring = memory.SampleRing(3)
+        self.assertEqual([], ring.column("rss_kb"))
+        for i in range(2):
+            ring.append((i, 100 + i, 200 + i, 1.5))
+        self.assertEqual(2, len(ring))
+        self.assertEqual([100, 101], ring.column("rss_kb"))
+        
+        for i in range(2, 7):
+            ring.append((i, 100 + i, 200 + i, 1.5))
+        self.assertEqual(3, len(ring))
+        self.assertEqual(4, ring.overwritten)
+        self.assertEqual([4.0, 5.0, 6.0], ring.column("timestamp"))
+        self.assertEqual([204, 205, 206], ring.column("vsz_kb"))
+        self.assertEqual(
+            {"timestamp": 4.0, "rss_kb": 104, "vsz_kb": 204, "cpu_percent": 1.5}, ring.to_list()[0])
+    
+    def test_full_ring(self):
+        ring = memory.SampleRing(3)
+        for i in range(6):
+            ring.append((i, i, i, 0))
+        self.assertEqual([3.0, 4.0, 5.0], ring.column("timestamp"))
+
+class StatisticsTest(unittest.TestCase):
+    def test_percentile(self):
+        self.assertEqual(0, memory.percentile([], 50))
+        self.assertEqual(7, memory.percentile([7], 0))
+        self.assertEqual(7, memory.percentile([7], 100))
+        values = [1, 2, 3, 4, 5]
+        self.assertEqual(1, memory.percentile(values, 0))
+        self.assertEqual(5, memory.percentile(values, 100))
+        self.assertEqual(3, memory.percentile(values, 50))
+        self.assertAlmostEqual(4.6, memory.percentile(values, 90))
+    
+    def test_linear_trend(self):
+        self.assertEqual((0.0, 0.0), memory.linear_trend([1], [1]))
+        self.assertEqual((0.0, 0.0), memory.linear_trend([1, 1], [1, 2]))
+        slope, r_squared = memory.linear_trend([0, 1, 2, 3], [1, 3, 5, 7])
+        self.assertAlmostEqual(2.0, slope)
+        self.assertAlmostEqual(1.0, r_squared)
+        self.assertEqual((0.0, 0.0), memory.linear_trend([0, 1, 2], [5, 5, 5]))
+
+class AnalysisTest(unittest.TestCase):
+    def setUp(self):
+        self.profiler = memory.MemoryProfiler(capacity=10)
+        self.timestamps = [1000.0 + t for t in range(0, 61, 2)]
+    
+    def test_rising_series_is_a_leak(self):
+        # 2 MB a minute, with a little noise
+        rss = [100 * 1024 + (t - 1000) * 2 * 1024 / 60 + (i % 2) * 50 for i, t in enumerate(self.timestamps)]
+        growth = self.profiler.analyze_growth(self.timestamps, rss)
+        self.assertTrue(growth["leak_suspected"])
+        self.assertAlmostEqual(2.0, growth["slope_mb_per_min"], places=1)
+        self.assertEqual(60.0, growth["duration_s"])
+    
+    def test_flat_series_is_not_a_leak(self):
+        rss = [100 * 1024 + (i % 3) * 200 for i in range(len(self.timestamps))]
+        self.assertFalse(self.profiler.analyze_growth(self.timestamps, rss)["leak_suspected"])
+    
+    def test_leak_thresholds(self):
+        def growth(mb_per_min, timestamps):
+            rss = [(t - timestamps[0]) * mb_per_min * 1024 / 60 for t in timestamps]
+            return self.profiler.analyze_growth(timestamps, rss)
+        
+        self.assertFalse(growth(0.5, self.timestamps)["leak_suspected"])  # Too slow
+        self.assertTrue(growth(1.0, self.timestamps)["leak_suspected"])
+        self.assertFalse(growth(5.0, self.timestamps[:4])["leak_suspected"])  # Too short
+        
+        # Steep but noisy: the fit is too poor to call it a leak
+        rss = [(i % 2) * 10 * 1024 + i * 200 for i in range(len(self.timestamps))]
+        noisy = self.profiler.analyze_growth(self.timestamps, rss)
+        self.assertGreater(noisy["slope_mb_per_min"], 5)
+        self.assertLess(noisy["r_squared"], 0.6)
+        self.assertFalse(noisy["leak_suspected"])
+        self.assertFalse(self.profiler.analyze_growth([1.0], [5.0])["leak_suspected"])
+    
+    def test_phases(self):
+        self.assertEqual([], self.profiler.analyze_phases([1.0], [1024.0], [0.0]))
+        self.profiler.mark_phase("render", 2.0)
+        self.profiler.mark_phase("export", 4.0)
+        self.profiler.mark_phase("idle", 10.0)
+        timestamps = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+        rss = [1024.0, 2048.0, 4096.0, 3072.0, 5120.0, 1024.0]
+        cpu = [0.0, 50.0, 100.0, 10.0, 20.0, 30.0]
+        phases = self.profiler.analyze_phases(timestamps, rss, cpu)
+        self.assertEqual(["unmarked", "render", "export", "idle"], [p["name"] for p in phases])
+        self.assertEqual([1, 2, 3, 0], [p["samples"] for p in phases])
+        render = phases[1]
+        self.assertEqual(1.0, render["duration_s"])
+        self.assertEqual(2.0, render["delta_mb"])
+        self.assertEqual(4.0, render["peak_rss_mb"])
+        self.assertEqual(75.0, render["avg_cpu"])
+        self.assertEqual(-2.0, phases[2]["delta_mb"])
+    
+    def test_load_markers(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("12.5 cold start\n\nbad\n10 warm up\n")
+        self.addCleanup(os.remove, f.name)
+        self.profiler.load_markers(f.name)
+        self.assertEqual([(12.5, "cold start"), (10.0, "warm up")], self.profiler.markers)
+
+@unittest.skipUnless(os.path.isdir("/proc/self"), "needs /proc")
+class ProcSamplerTest(unittest.TestCase):
+    def test_sample_self(self):
+        sampler = memory.ProcSampler(os.getpid())
+        self.addCleanup(sampler.close)
+        timestamp, rss_kb, vsz_kb, cpu_percent = sampler.sample()
+        self.assertGreater(rss_kb, 0)
+        self.assertGreaterEqual(vsz_kb, rss_kb)
+        self.assertGreaterEqual(cpu_percent, 0)
+        status = sampler.status()
+        self.assertGreater(status["vm_hwm_kb"], 0)
+        self.assertGreaterEqual(status["threads"], 1)
+    
+    def test_missing_process(self):
+        with open("/proc/sys/kernel/pid_max") as f:
+            pid_max = int(f.read())
+        self.assertRaises(OSError, memory.ProcSampler, pid_max + 1)
+    
+    def test_find_pid_by_name(self):
+        self.assertIsNone(memory.find_pid_by_name("no-such-process-for-sure"))
+        process = subprocess.Popen(["sleep", "10"])
+        self.addCleanup(process.wait)
+        self.addCleanup(process.kill)
+        self.assertEqual(process.pid, memory.find_pid_by_name("sleep"))
+    
+    def test_main(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        output = os.path.join(tmp, "report.json")
+        argv = ["memory_analysis.py", "--pid", str(os.getpid()), "--duration", "0.2", "--interval", "0.01",
+                "--output", output]
+        with mock.patch.object(sys, "argv", argv), contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(0, memory.main())
+        with open(output) as f:
+            report = json.load(f)
+        self.assertGreater(report["statistics"]["total_samples"], 1)
+        
+        argv = ["memory_analysis.py", "--backend", "proc", "--process", "no-such-process-for-sure"]
+        with mock.patch.object(sys, "argv", argv), contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(1, memory.main())
+
+if __name__ == "__main__":
+    unittest.main()
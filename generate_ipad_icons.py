@@ -1,34 +1,250 @@
 #!/usr/bin/env python3
+"""
+Generate the app icons listed in an AppIcon.appiconset/Contents.json
+
+Every image in the manifest (all idioms and sizes) is resized from the
+largest one, the 1024px marketing icon:
+  - the source is decoded once, and only when something has to be generated
+  - each size is downscaled from the smallest already generated size that is
+    still at least twice as large, instead of from the 1024px source
+  - independent chains of sizes are resized and saved in a process pool
+  - outputs whose source hash and size are unchanged since the last run are
+    skipped, using a small cache manifest (--cache)
+"""
 
 from PIL import Image
+import argparse
+import hashlib
+import json
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_APPICONSET = os.path.join(
+    REPO_ROOT, "PrintMyRide", "Shared", "Resources", "Assets", "Assets.xcassets", "AppIcon.appiconset")
+DEFAULT_CACHE = os.path.join(REPO_ROOT, "build", "icon_cache.json")
+
+# An intermediate is only reused for sizes at most half as large, so LANCZOS
+# still has enough pixels to filter from
+MIN_REUSE_RATIO = 2
+
+def pixel_size(image: dict) -> int:
+    """Pixel size of a manifest entry: "83.5x83.5" at "2x" is 167"""
+    points = float(image["size"].split("x")[0])
+    scale = float(image.get("scale", "1x").rstrip("x"))
+    return int(round(points * scale))
+
+def read_manifest(appiconset: str) -> dict:
+    """Map each filename in Contents.json to its pixel size
+
+    The same file may be listed for several idioms (e.g. icon_20x20@2x.png for
+    iPhone and iPad), but only ever at one size.
+    """
+    with open(os.path.join(appiconset, "Contents.json")) as f:
+        manifest = json.load(f)
+
+    outputs = {}
+    for image in manifest.get("images", []):
+        filename = image.get("filename")
+        if not filename or "size" not in image:
+            continue
+        size = pixel_size(image)
+        if outputs.setdefault(filename, size) != size:
+            raise ValueError(f"{filename} is listed at {outputs[filename]}px and {size}px")
+    return outputs
+
+def file_hash(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def load_cache(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(path: str, cache: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+def output_stamp(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def is_up_to_date(entry, source_hash: str, size: int, path: str) -> bool:
+    """An output is up to date if it was made from the same source at the same
+    size, and has not been touched since"""
+    return (bool(entry) and entry.get("source") == source_hash and entry.get("size") == size
+            and entry.get("stamp") == output_stamp(path))
+
+def plan_chains(sizes, source_size: int) -> list:
+    """Group pixel sizes into chains that can be resized independently
+
+    Each size gets a base: the smallest larger size that is at least
+    MIN_REUSE_RATIO times as large, or the source.  A chain is a size resized
+    from the source followed by everything derived from it, largest first, so
+    every base is resized before the sizes that reuse it.
+    """
+    ordered = sorted(set(sizes), reverse=True)
+    bases = {}
+    for i, size in enumerate(ordered):
+        candidates = [s for s in ordered[:i] if size * MIN_REUSE_RATIO <= s < source_size]
+        bases[size] = min(candidates) if candidates else None
+
+    chains = []
+    for size in ordered:
+        if bases[size] is None:
+            chains.append([(size, None)])
+        else:
+            root = size
+            while bases[root] is not None:
+                root = bases[root]
+            next(chain for chain in chains if chain[0][0] == root).append((size, bases[size]))
+    return chains
+
+# The decoded source, set once per worker process by init_worker
+_source_image = None
+
+def init_worker(mode: str, size, pixels: bytes):
+    global _source_image
+    _source_image = Image.frombytes(mode, size, pixels)
+
+def resize_chain(chain, targets: dict) -> list:
+    """Resize and save one chain; |targets| maps each size to its output paths
+
+    Returns (size, resize seconds, save seconds) for every size in the chain.
+    """
+    resized = {}
+    timings = []
+    for size, base in chain:
+        start = time.perf_counter()
+        image = _source_image if base is None else resized[base]
+        if image.size != (size, size):
+            image = image.resize((size, size), Image.LANCZOS)
+        resized[size] = image
+        resize_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for path in targets[size]:
+            image.save(path, "PNG")
+        timings.append((size, resize_seconds, time.perf_counter() - start))
+    return timings
+
+def generate_icons(appiconset: str, source: str = None, cache_path: str = DEFAULT_CACHE,
+                   jobs: int = None, force: bool = False) -> dict:
+    """Generate the outdated icons of |appiconset|; returns a report dict"""
+    started = time.perf_counter()
+    outputs = read_manifest(appiconset)
+    if not outputs:
+        raise ValueError(f"no images with a filename in {appiconset}/Contents.json")
+    if source is None:
+        source = os.path.join(appiconset, max(outputs, key=outputs.get))
+
+    stage_start = time.perf_counter()
+    source_hash = file_hash(source)
+    hash_seconds = time.perf_counter() - stage_start
+
+    cache = load_cache(cache_path)
+    pending = {}
+    skipped = []
+    for filename, size in sorted(outputs.items()):
+        path = os.path.join(appiconset, filename)
+        if os.path.abspath(path) == os.path.abspath(source):
+            continue
+        if not force and is_up_to_date(cache.get(filename), source_hash, size, path):
+            skipped.append(filename)
+        else:
+            pending.setdefault(size, []).append(path)
+
+    report = {
+        "source": source,
+        "generated": [],
+        "skipped": skipped,
+        "sizes": {},
+        "timings": {"hash_seconds": hash_seconds, "decode_seconds": 0.0},
+    }
+    if pending:
+        stage_start = time.perf_counter()
+        with Image.open(source) as img:
+            img.load()
+            if img.width != img.height:
+                raise ValueError(f"{source} is {img.width}x{img.height}, expected a square icon")
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA")
+            mode, source_size, pixels = img.mode, img.size, img.tobytes()
+        report["timings"]["decode_seconds"] = time.perf_counter() - stage_start
+
+        chains = plan_chains(pending, source_size[0])
+        jobs = min(jobs or os.cpu_count() or 1, len(chains))
+        if jobs > 1:
+            with ProcessPoolExecutor(jobs, initializer=init_worker,
+                                     initargs=(mode, source_size, pixels)) as pool:
+                results = list(pool.map(resize_chain, chains, [pending] * len(chains)))
+        else:
+            init_worker(mode, source_size, pixels)
+            results = [resize_chain(chain, pending) for chain in chains]
+
+        for chain, timings in zip(chains, results):
+            bases = dict(chain)
+            for size, resize_seconds, save_seconds in timings:
+                report["sizes"][size] = {
+                    "from": bases[size] or source_size[0],
+                    "resize_seconds": resize_seconds,
+                    "save_seconds": save_seconds,
+                }
+
+        for size, paths in pending.items():
+            for path in paths:
+                filename = os.path.basename(path)
+                cache[filename] = {"source": source_hash, "size": size, "stamp": output_stamp(path)}
+                report["generated"].append(filename)
+        report["generated"].sort()
+        report["jobs"] = jobs
+        save_cache(cache_path, cache)
+
+    report["timings"]["total_seconds"] = time.perf_counter() - started
+    return report
+
+def print_report(report: dict):
+    timings = report["timings"]
+    print(f"📐 Source: {report['source']}")
+    print(f"   hash {timings['hash_seconds'] * 1000:.1f}ms, decode {timings['decode_seconds'] * 1000:.1f}ms")
+    for size, stats in sorted(report["sizes"].items(), reverse=True):
+        print(f"   {size:>4}px from {stats['from']:>4}px: resize {stats['resize_seconds'] * 1000:6.1f}ms, "
+              f"save {stats['save_seconds'] * 1000:6.1f}ms")
+    print(f"✅ Generated {len(report['generated'])} icons, {len(report['skipped'])} up to date "
+          f"in {timings['total_seconds'] * 1000:.1f}ms"
+          + (f" ({report['jobs']} workers)" if report["generated"] else ""))
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate app icons from an AppIcon.appiconset manifest")
+    parser.add_argument("appiconset", nargs="?", default=DEFAULT_APPICONSET,
+                        help="AppIcon.appiconset directory with a Contents.json")
+    parser.add_argument("--source", help="source icon (default: the largest image in the manifest)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="cache manifest of generated icons")
+    parser.add_argument("-j", "--jobs", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="regenerate icons that are up to date")
+    args = parser.parse_args()
+
+    try:
+        report = generate_icons(args.appiconset, args.source, args.cache, args.jobs, args.force)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    print_report(report)
+    return 0
 
-# Path to the source icon and output directory
-source_icon = "/Users/donnysmith/CC/printmyride/PrintMyRide/Assets.xcassets/AppIcon.appiconset/icon_1024x1024@1x.png"
-output_dir = "/Users/donnysmith/CC/printmyride/PrintMyRide/Assets.xcassets/AppIcon.appiconset"
-
-# Load the source icon
-img = Image.open(source_icon)
-
-# Define ALL the missing iPad icons with their sizes
-ipad_icons = [
-    ("icon_20x20@1x.png", 20),    # iPad Notifications 20pt @1x
-    ("icon_20x20@2x.png", 40),    # iPad Notifications 20pt @2x (reuse iPhone icon)
-    ("icon_29x29@1x.png", 29),    # iPad Settings 29pt @1x
-    ("icon_29x29@2x.png", 58),    # iPad Settings 29pt @2x (reuse iPhone icon)
-    ("icon_40x40@1x.png", 40),    # iPad Spotlight 40pt @1x
-    ("icon_40x40@2x.png", 80),    # iPad Spotlight 40pt @2x (reuse iPhone icon)
-    ("icon_76x76@2x.png", 152),   # iPad App 76pt @2x
-    ("icon_83.5x83.5@2x.png", 167) # iPad Pro App 83.5pt @2x
-]
-
-for filename, size in ipad_icons:
-    # Resize the image
-    resized = img.resize((size, size), Image.LANCZOS)
-    
-    # Save the resized image
-    output_path = os.path.join(output_dir, filename)
-    resized.save(output_path, "PNG")
-    print(f"Created {filename} ({size}x{size})")
-
-print("\nAll iPad icons generated successfully!")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Unit tests for generate_ipad_icons.py"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from PIL import Image
+
+import generate_ipad_icons as icons
+
+MANIFEST = {
+    "images": [
+        {"filename": "icon_20x20@2x.png", "idiom": "iphone", "scale": "2x", "size": "20x20"},
+        {"filename": "icon_60x60@3x.png", "idiom": "iphone", "scale": "3x", "size": "60x60"},
+        {"filename": "icon_20x20@1x.png", "idiom": "ipad", "scale": "1x", "size": "20x20"},
+        {"filename": "icon_20x20@2x.png", "idiom": "ipad", "scale": "2x", "size": "20x20"},
+        {"filename": "icon_40x40@1x.png", "idiom": "ipad", "scale": "1x", "size": "40x40"},
+        {"filename": "icon_83.5x83.5@2x.png", "idiom": "ipad", "scale": "2x", "size": "83.5x83.5"},
+        {"idiom": "ipad", "scale": "2x", "size": "76x76"},
+        {"filename": "icon_1024x1024@1x.png", "idiom": "ios-marketing", "scale": "1x", "size": "1024x1024"},
+    ],
+    "info": {"author": "xcode", "version": 1},
+}
+
+class GenerateIconsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.appiconset = os.path.join(self.tmp, "AppIcon.appiconset")
+        os.mkdir(self.appiconset)
+        with open(os.path.join(self.appiconset, "Contents.json"), "w") as f:
+            json.dump(MANIFEST, f)
+        self.source = os.path.join(self.appiconset, "icon_1024x1024@1x.png")
+        self.write_source((255, 0, 0))
+        self.cache = os.path.join(self.tmp, "build", "icon_cache.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write_source(self, color):
+        img = Image.new("RGB", (1024, 1024), color)
+        img.paste((0, 0, 255), (0, 0, 512, 512))
+        img.save(self.source, "PNG")
+
+    def generate(self, **kwargs):
+        return icons.generate_icons(self.appiconset, cache_path=self.cache, jobs=1, **kwargs)
+
+    def test_read_manifest(self):
+        self.assertEqual({
+            "icon_20x20@1x.png": 20,
+            "icon_20x20@2x.png": 40,
+            "icon_40x40@1x.png": 40,
+            "icon_60x60@3x.png": 180,
+            "icon_83.5x83.5@2x.png": 167,
+            "icon_1024x1024@1x.png": 1024,
+        }, icons.read_manifest(self.appiconset))
+
+    def test_conflicting_sizes(self):
+        manifest = {"images": [
+            {"filename": "a.png", "scale": "1x", "size": "20x20"},
+            {"filename": "a.png", "scale": "2x", "size": "20x20"},
+        ]}
+        with open(os.path.join(self.appiconset, "Contents.json"), "w") as f:
+            json.dump(manifest, f)
+        self.assertRaises(ValueError, icons.read_manifest, self.appiconset)
+
+    def test_plan_chains(self):
+        chains = icons.plan_chains([20, 29, 40, 58, 80, 87, 167, 180, 1024], 1024)
+        self.assertEqual([
+            [(1024, None)],
+            [(180, None), (87, 180)],
+            [(167, None), (80, 167), (58, 167), (40, 80), (29, 58), (20, 40)],
+        ], chains)
+        for chain in chains:
+            done = set()
+            for size, base in chain:
+                self.assertTrue(base is None or (base in done and base >= 2 * size))
+                done.add(size)
+
+    def test_generate(self):
+        report = self.generate()
+        self.assertEqual(["icon_20x20@1x.png", "icon_20x20@2x.png", "icon_40x40@1x.png",
+                          "icon_60x60@3x.png", "icon_83.5x83.5@2x.png"], report["generated"])
+        for filename, size in icons.read_manifest(self.appiconset).items():
+            with Image.open(os.path.join(self.appiconset, filename)) as img:
+                self.assertEqual((size, size), img.size)
+                self.assertEqual((0, 0, 255), img.getpixel((0, 0))[:3])
+                self.assertEqual((255, 0, 0), img.getpixel((size - 1, size - 1))[:3])
+        self.assertEqual({20, 40, 167, 180}, set(report["sizes"]))
+        self.assertTrue(os.path.exists(self.cache))
+
+    def test_incremental(self):
+        self.generate()
+        report = self.generate()
+        self.assertEqual([], report["generated"])
+        self.assertEqual(5, len(report["skipped"]))
+
+        os.remove(os.path.join(self.appiconset, "icon_40x40@1x.png"))
+        report = self.generate()
+        self.assertEqual(["icon_40x40@1x.png"], report["generated"])
+
+        self.write_source((0, 255, 0))
+        report = self.generate()
+        self.assertEqual(5, len(report["generated"]))
+        with Image.open(os.path.join(self.appiconset, "icon_20x20@1x.png")) as img:
+            self.assertEqual((0, 255, 0), img.getpixel((19, 19))[:3])
+
+        self.assertEqual(5, len(self.generate(force=True)["generated"]))
+
+    def test_process_pool(self):
+        report = icons.generate_icons(self.appiconset, cache_path=self.cache, jobs=2)
+        self.assertEqual(2, report["jobs"])
+        self.assertEqual(5, len(report["generated"]))
+        with Image.open(os.path.join(self.appiconset, "icon_60x60@3x.png")) as img:
+            self.assertEqual((180, 180), img.size)
+
+if __name__ == "__main__":
+    unittest.main()